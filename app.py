@@ -1,11 +1,16 @@
 # aquifer/app.py
-from flask import Flask, jsonify, request
+from flask import Flask, Response, request
 from flask_cors import CORS
-import pandas as pd
-from sklearn.linear_model import LinearRegression
 import numpy as np
-from datetime import timedelta
+import orjson
+import polars as pl
+from numba import njit
+from collections import namedtuple
+from functools import lru_cache
+from hashlib import blake2b
 import os
+import threading
+import time
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
@@ -13,6 +18,7 @@ CORS(app)  # Enable CORS for all routes
 # Dynamically list CSV files in the directory
 DATA_DIR = os.path.dirname(os.path.abspath(__file__))
 CSV_FILES = [f for f in os.listdir(DATA_DIR) if f.endswith('.csv')]
+DEFAULT_SOURCE = CSV_FILES[0] if CSV_FILES else None
 
 CITY_INFO = {
     'bhubaneswar_odisha.csv': {'name': 'Bhubaneswar, Odisha', 'coords': [20.2961, 85.8245]},
@@ -20,85 +26,93 @@ CITY_INFO = {
     'nagpur_maharashtra.csv': {'name': 'Nagpur, Maharashtra', 'coords': [21.1458, 79.0882]}
 }
 
-@app.route('/api/well-data')
-def get_well_data():
-    source = request.args.get('source', CSV_FILES[0] if CSV_FILES else None)
-    if not source or source not in CSV_FILES:
-        return jsonify({'error': 'Invalid source'}), 400
-    df = pd.read_csv(os.path.join(DATA_DIR, source))
-    df['Date'] = pd.to_datetime(df['Date'])
-    df = df.sort_values(by='Date')
-    N = 90
-    df_recent = df.tail(N).copy()
-    window = 5
-    df_recent['Smoothed_Level'] = df_recent['Water_Level_m'].rolling(window=window, min_periods=1).mean()
-    data = {
-        'dates': df_recent['Date'].dt.strftime('%Y-%m-%d').tolist(),
-        'levels': df_recent['Smoothed_Level'].tolist()
-    }
-    return jsonify(data)
+# Number of most recent readings served, and rolling window used to smooth them
+N = 90
+WINDOW = 5
 
-@app.route('/api/predict')
-def get_prediction():
-    source = request.args.get('source', CSV_FILES[0] if CSV_FILES else None)
-    if not source or source not in CSV_FILES:
-        return jsonify({'error': 'Invalid source'}), 400
-    df = pd.read_csv(os.path.join(DATA_DIR, source))
-    df['Date'] = pd.to_datetime(df['Date'])
-    df = df.sort_values(by='Date')
-    
-    # Use the same data processing as well-data endpoint for consistency
-    N = 90
-    df_recent = df.tail(N).copy()
-    window = 5
-    df_recent['Smoothed_Level'] = df_recent['Water_Level_m'].rolling(window=window, min_periods=1).mean()
-    
-    # Use sequential index instead of day_of_year for better trend continuation
-    df_recent = df_recent.reset_index(drop=True)
-    X = df_recent.index.values.reshape(-1, 1)  # Sequential days: 0, 1, 2, 3...
-    y = df_recent['Smoothed_Level']
-    
-    model = LinearRegression()
-    model.fit(X, y)
-    
-    # Get last values for continuity check
-    last_date = df_recent['Date'].iloc[-1]
-    last_smoothed_value = df_recent['Smoothed_Level'].iloc[-1]
-    
+# Forecast horizon in days
+HORIZON = 30
+
+# An explicit signature makes Numba compile eagerly at import (or load the
+# on-disk cache) instead of on the first request. fastmath is left off: it
+# would let LLVM assume there are no NaNs, and missing readings are NaN.
+# Served level arrays are float32: readings carry ~3 significant digits, so
+# this halves the cache and keeps serialized responses short. Readings are
+# parsed and processed in float64; only the outputs are narrowed.
+@njit('Tuple((float32[::1], float32[::1], float64))(float64[::1], int64, int64)', cache=True)
+def compute_payload(x, w, horizon):
+    # Single pass over the readings that produces both the smoothed series and
+    # the forecast. Smoothing is a trailing mean over the non-NaN values of the
+    # last w samples, matching pandas rolling(window=w, min_periods=1).mean();
+    # a window with no readings at all is NaN. The same loop accumulates the
+    # sums for an ordinary least squares fit of smoothed level against the
+    # sequential day index 0, 1, 2, ... (better trend continuation than
+    # day_of_year), skipping NaN points. Everything is computed in float64;
+    # the smoothed and predicted arrays are stored as float32 and the last
+    # smoothed level is also returned unrounded for threshold checks.
+    n = x.shape[0]
+    smoothed = np.empty(n, dtype=np.float32)
+    last = np.nan
+    total = 0.0
+    count = 0
+    fit_n = 0
+    sum_x = 0.0
+    sum_y = 0.0
+    sum_xy = 0.0
+    sum_xx = 0.0
+    for i in range(n):
+        if not np.isnan(x[i]):
+            total += x[i]
+            count += 1
+        if i >= w and not np.isnan(x[i - w]):
+            total -= x[i - w]
+            count -= 1
+        if count == 0:
+            # Reset so rounding residue does not leak into the next window
+            total = 0.0
+            smoothed[i] = np.nan
+            last = np.nan
+            continue
+        level = total / count
+        smoothed[i] = level
+        last = level
+        fit_n += 1
+        sum_x += i
+        sum_y += level
+        sum_xy += i * level
+        sum_xx += i * i
+
+    denom = fit_n * sum_xx - sum_x * sum_x
+    slope = (fit_n * sum_xy - sum_x * sum_y) / denom if denom != 0.0 else 0.0
+
+    # The fitted line is shifted so the first prediction matches the last
+    # historical value; with that continuity adjustment the intercept cancels
+    # and day n+k is predicted as last + slope * k
+    predicted = np.empty(horizon, dtype=np.float32)
+    for k in range(horizon):
+        predicted[k] = last + slope * k
+    return smoothed, predicted, last
+
+def future_dates(last_date):
     # Predict future values continuing the sequence
-    future_dates = [last_date + timedelta(days=i) for i in range(1, 31)]
-    future_X = np.array([len(df_recent) + i for i in range(30)]).reshape(-1, 1)
-    predicted_levels = model.predict(future_X)
-    
-    # Ensure continuity by adjusting first prediction to match last historical value
-    if len(predicted_levels) > 0:
-        adjustment = last_smoothed_value - predicted_levels[0]
-        predicted_levels = predicted_levels + adjustment
-    
-    prediction_data = {
-        'future_dates': [date.strftime('%Y-%m-%d') for date in future_dates],
-        'predicted_levels': predicted_levels.tolist()
-    }
-    return jsonify(prediction_data)
+    days = last_date.astype('datetime64[D]') + np.arange(1, HORIZON + 1)
+    return np.datetime_as_string(days, unit='D').tolist()
 
-@app.route('/api/analysis')
-def get_analysis():
-    source = request.args.get('source', CSV_FILES[0] if CSV_FILES else None)
-    if not source or source not in CSV_FILES:
-        return jsonify({'error': 'Invalid source'}), 400
-    df = pd.read_csv(os.path.join(DATA_DIR, source))
-    df['Date'] = pd.to_datetime(df['Date'])
-    df = df.sort_values(by='Date')
-    
-    # Use same smoothed data processing for consistency
-    N = 90
-    df_recent = df.tail(N).copy()
-    window = 5
-    df_recent['Smoothed_Level'] = df_recent['Water_Level_m'].rolling(window=window, min_periods=1).mean()
-    
-    # Use the most recent smoothed level for analysis
-    last_level = df_recent['Smoothed_Level'].iloc[-1]
-    
+def read_levels(path):
+    # Returns (dates, levels) as numpy arrays sorted by date. Exported readings
+    # are normally already in date order, so only sort when they are not.
+    # Blank Water_Level_m cells come through as NaN.
+    df = (
+        pl.scan_csv(path, try_parse_dates=True)
+        .select(['Date', pl.col('Water_Level_m').cast(pl.Float64)])
+        .collect()
+    )
+    if not df['Date'].is_sorted():
+        df = df.sort('Date', maintain_order=True)
+    return df['Date'].to_numpy(), df['Water_Level_m'].to_numpy()
+
+def analysis_body(last_level):
+    # Serialized /api/analysis response for the most recent smoothed level
     critical_threshold = 2.15
     semi_critical_threshold = 2.25
     if last_level < critical_threshold:
@@ -123,7 +137,154 @@ def get_analysis():
             "Continue regular data monitoring to track trends."
         ]
     analysis_data = {'condition': condition, 'steps': steps}
-    return jsonify(analysis_data)
+    return orjson.dumps(analysis_data)
+
+def dumps_json(obj):
+    # orjson serializes numpy arrays directly, skipping the per-element tolist()
+    return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+
+# Serialized endpoint bodies for the last N readings of a CSV. The ETag is a
+# hash of the bodies themselves, so it also changes when a deploy changes the
+# response format without touching the CSV.
+Cached = namedtuple('Cached', ['mtime', 'etag', 'well_data_body', 'prediction_body', 'analysis_body'])
+
+@lru_cache(maxsize=max(len(CSV_FILES), 1))
+def _load(source, mtime):
+    # mtime is part of the cache key so a rewritten CSV is re-parsed automatically
+    dates, levels = read_levels(os.path.join(DATA_DIR, source))
+    # Copy the tail into a writable, contiguous float64 array as the kernel's
+    # signature expects (polars may hand back read-only views)
+    dates, levels = dates[-N:], np.array(levels[-N:], dtype=np.float64)
+    smoothed, predicted_levels, last_level = compute_payload(levels, WINDOW, HORIZON)
+    well_data_body = dumps_json({
+        'dates': np.datetime_as_string(dates, unit='D').tolist(),
+        'levels': smoothed
+    })
+    prediction_body = dumps_json({
+        'future_dates': future_dates(dates[-1]),
+        'predicted_levels': predicted_levels
+    })
+    # Use same smoothed data processing for consistency, but classify the
+    # float64 level so float32 rounding cannot push it across a threshold
+    analysis = analysis_body(last_level)
+    digest = blake2b(digest_size=16)
+    for body in (well_data_body, prediction_body, analysis):
+        digest.update(body)
+    return Cached(
+        mtime=mtime,
+        etag=digest.hexdigest(),
+        well_data_body=well_data_body,
+        prediction_body=prediction_body,
+        analysis_body=analysis,
+    )
+
+def source_mtime(source):
+    return os.path.getmtime(os.path.join(DATA_DIR, source))
+
+# Every CSV is loaded once at startup so handlers never touch the disk;
+# a daemon thread swaps in a fresh entry whenever a file's mtime changes.
+# Only sources that loaded successfully are accepted by the endpoints.
+REFRESH_INTERVAL = 5  # seconds
+PRECOMP = {}
+CSV_SET = frozenset()
+_failed_mtimes = {}  # source -> mtime (None if missing) of the last failed load
+
+def _refresh(source):
+    global CSV_SET
+    try:
+        mtime = source_mtime(source)
+    except OSError:
+        mtime = None
+    current = PRECOMP.get(source)
+    if current is not None and current.mtime == mtime:
+        return
+    if source in _failed_mtimes and _failed_mtimes[source] == mtime:
+        # Already reported this version of the file
+        return
+    try:
+        if mtime is None:
+            raise FileNotFoundError('file no longer exists')
+        PRECOMP[source] = _load(source, mtime)
+    except Exception as e:
+        # Keep serving the last good copy (e.g. file mid-write or removed)
+        _failed_mtimes[source] = mtime
+        app.logger.warning('Failed to load %s: %s', source, e)
+        return
+    _failed_mtimes.pop(source, None)
+    if source not in CSV_SET:
+        CSV_SET = CSV_SET | {source}
+
+for _source in CSV_FILES:
+    _refresh(_source)
+
+def _watch_csv_files():
+    while True:
+        time.sleep(REFRESH_INTERVAL)
+        for source in CSV_FILES:
+            _refresh(source)
+
+threading.Thread(target=_watch_csv_files, name='csv-watcher', daemon=True).start()
+
+# Error body is serialized once; a fresh Response is still built per request
+# because Flask/CORS mutate response headers after the handler returns
+BAD_SOURCE_BODY = orjson.dumps({'error': 'Invalid source'})
+
+def _resolve():
+    source = request.args.get('source', DEFAULT_SOURCE)
+    return source if source in CSV_SET else None
+
+def _bad_source():
+    return Response(BAD_SOURCE_BODY, status=400, mimetype='application/json')
+
+def json_response(body, etag=None):
+    resp = Response(body, mimetype='application/json')
+    if etag is not None:
+        resp.set_etag(etag)
+    return resp
+
+def _not_modified(c):
+    # A matching ETag means the client's copy is current and the body can be
+    # skipped. If-None-Match uses weak comparison (RFC 9110), so W/"..." matches.
+    if not request.if_none_match.contains_weak(c.etag):
+        return None
+    resp = Response(status=304)
+    resp.set_etag(c.etag)
+    return resp
+
+@app.route('/api/well-data')
+def get_well_data():
+    source = _resolve()
+    if source is None:
+        return _bad_source()
+    c = PRECOMP[source]
+    not_modified = _not_modified(c)
+    if not_modified is not None:
+        return not_modified
+    return json_response(c.well_data_body, c.etag)
+
+@app.route('/api/predict')
+def get_prediction():
+    source = _resolve()
+    if source is None:
+        return _bad_source()
+    
+    # Forecast is computed once per file version alongside the well data
+    c = PRECOMP[source]
+    not_modified = _not_modified(c)
+    if not_modified is not None:
+        return not_modified
+    return json_response(c.prediction_body, c.etag)
+
+@app.route('/api/analysis')
+def get_analysis():
+    source = _resolve()
+    if source is None:
+        return _bad_source()
+    c = PRECOMP[source]
+    not_modified = _not_modified(c)
+    if not_modified is not None:
+        return not_modified
+    return json_response(c.analysis_body, c.etag)
 
 if __name__ == '__main__':
     import os
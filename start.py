@@ -3,8 +3,12 @@
 Start script for Render deployment
 """
 import os
+from waitress import serve
 from app import app
 
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
-    app.run(host='0.0.0.0', port=port, debug=False)
\ No newline at end of file
+    # Production WSGI server: requests are handled by a thread pool instead of
+    # the Flask development server
+    threads = int(os.environ.get('WEB_THREADS', 4))
+    serve(app, host='0.0.0.0', port=port, threads=threads)
@@ -0,0 +1,53 @@
+import numpy as np
+import orjson
+import pandas as pd
+import pytest
+from sklearn.linear_model import LinearRegression
+
+from app import HORIZON, WINDOW, analysis_body, app, compute_payload
+
+
+def baseline(levels):
+    # The original pandas rolling mean + LinearRegression forecast, including
+    # the continuity adjustment, with NaN smoothed points left out of the fit
+    smoothed = pd.Series(levels, dtype=np.float64).rolling(window=WINDOW, min_periods=1).mean()
+    fit = smoothed.dropna()
+    model = LinearRegression()
+    model.fit(fit.index.values.reshape(-1, 1), fit.values)
+    future_X = np.arange(len(levels), len(levels) + HORIZON).reshape(-1, 1)
+    predicted = model.predict(future_X)
+    predicted = predicted + (smoothed.iloc[-1] - predicted[0])
+    return smoothed.to_numpy(), predicted
+
+
+@pytest.mark.parametrize('levels', [
+    np.random.default_rng(0).normal(2.2, 0.1, 90),
+    [2.0, 2.1, np.nan, 2.2, 2.3, 2.4, 2.2, 2.1, 2.0, 2.3],
+    [2.0, np.nan, np.nan, np.nan, np.nan, np.nan, 2.4, 2.2, 2.1],
+    [2.0, 2.1, 2.3],
+], ids=['random', 'nan', 'empty-window', 'shorter-than-window'])
+def test_compute_payload_matches_baseline(levels):
+    levels = np.asarray(levels, dtype=np.float64)
+    smoothed, predicted, last_level = compute_payload(levels, WINDOW, HORIZON)
+    expected_smoothed, expected_predicted = baseline(levels)
+    assert last_level == pytest.approx(expected_smoothed[-1], abs=1e-12)
+    np.testing.assert_allclose(smoothed, expected_smoothed, rtol=0, atol=1e-5)
+    np.testing.assert_allclose(predicted, expected_predicted, rtol=0, atol=1e-5)
+    assert not np.isnan(predicted).any()
+
+
+def test_condition_uses_unrounded_level():
+    # 2.1499999999 rounds up past the 2.15 threshold in float32
+    levels = np.full(10, 2.1499999999)
+    _, _, last_level = compute_payload(levels, WINDOW, HORIZON)
+    assert orjson.loads(analysis_body(last_level))['condition'] == 'Critical 🔴'
+
+
+@pytest.mark.parametrize('endpoint', ['well-data', 'predict', 'analysis'])
+def test_etag_revalidation(endpoint):
+    client = app.test_client()
+    resp = client.get(f'/api/{endpoint}')
+    etag = resp.headers['ETag']
+    assert client.get(f'/api/{endpoint}', headers={'If-None-Match': etag}).status_code == 304
+    assert client.get(f'/api/{endpoint}', headers={'If-None-Match': f'W/{etag}'}).status_code == 304
+    assert client.get(f'/api/{endpoint}', headers={'If-None-Match': '"stale"'}).status_code == 200